@@ -1,16 +1,22 @@
 import streamlit as st
+import mmap, os
 from uuid import uuid4, UUID
 from datetime import datetime
 from typing import Optional, List
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, wait
 
-from cama.models import PassageType, SamplingSession
-from cama.services import LocalStorageService, OfflineQueue, SyncService, SurveyDataRepository, InteractiveMapController, MeterConnectionManager, ValidationService
+from cama.models import Checkpoint, PassageType, SamplingSession, _PASSAGE_BY_VALUE
+from cama.services import LocalStorageService, OfflineQueue, SyncService, SurveyDataRepository, InteractiveMapController, MeterConnectionManager, ValidationService, _json_loads
 from cama.managers import CheckpointManager
 from cama.models import SurveyStation, GasReading, QueuedItem, QueueItemType
 
 DB = "cama.db"
 OUTBOX = "outbox.json"
+OUTBOX_PREVIEW_LINES = 50
+FLUSH_POLL_SECONDS = 0.5
+_PASSAGE_VALUES = tuple(p.value for p in PassageType)
+_READING_COLUMNS = (("captured_at", "captured_at"), ("O2 %", "o2_pct"), ("CO ppm", "co_ppm"), ("H2S ppm", "h2s_ppm"), ("LEL %", "lel_pct"))
 
 @st.cache_resource
 def get_services():
@@ -23,10 +29,60 @@ def get_services():
     mgr = CheckpointManager(mapc, storage, validator, queue)
     return storage, repo, mapc, queue, sync, mgr
 
+@st.cache_resource
+def get_flush_executor():
+    # One worker: flushes run in order and never overlap; storage serializes the SQLite writes
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="cama-flush")
+
+def start_flush(sync):
+    fut = st.session_state.get("flush_future")
+    if fut is None or fut.done():
+        st.session_state.flush_future = get_flush_executor().submit(sync.flush)
+
+def show_flush_status():
+    fut = st.session_state.get("flush_future")
+    if fut is None:
+        return
+    # Give the worker a moment; if it is still busy, show progress and rerun to poll again
+    wait([fut], timeout=FLUSH_POLL_SECONDS)
+    if not fut.done():
+        with st.status("Flushing offline queue…", state="running"):
+            st.write("Writing pending items to outbox.json in the background.")
+        st.rerun()
+    st.session_state.flush_future = None
+    try:
+        n = fut.result()
+    except Exception as e:
+        with st.status("Flush failed", state="error"):
+            st.write(str(e))
+    else:
+        st.success(f"Flushed {n} item(s) to outbox.json")
+
+@st.cache_resource
+def _seed_default_stations(_storage) -> bool:
+    # Runs once per process; INSERT OR IGNORE leaves existing stations untouched
+    _storage.seed_stations([
+        SurveyStation(name, name, x, y, z)
+        for name, x, y, z in [("A1",0,0,0), ("B5",10,2,0), ("C12",25,-3,-1), ("Z78",100,0,-5)]
+    ])
+    return True
+
 def seed_default_stations(storage):
-    if not storage.list_stations():
-        for name, x, y, z in [("A1",0,0,0), ("B5",10,2,0), ("C12",25,-3,-1), ("Z78",100,0,-5)]:
-            storage.upsert_station(SurveyStation(name, name, x, y, z))
+    _seed_default_stations(storage)
+
+@st.cache_data(ttl=5)
+def checkpoints_frame(version: int, _cps: List[Checkpoint]) -> pd.DataFrame:
+    # Keyed on the manager's version only (the leading underscore skips hashing _cps);
+    # the manager is a shared cache_resource, so the version is the same for every session
+    return pd.DataFrame({
+        "id": [str(c.id) for c in _cps],
+        "name": [c.name for c in _cps],
+        "passage_type": [c.passage_type.value for c in _cps],
+        "station": [c.survey_station_id for c in _cps],
+        "depth": [c.depth_from_entrance for c in _cps],
+        "distance": [c.distance_from_station for c in _cps],
+        "updated_at": [c.updated_at for c in _cps],
+    })
 
 def page_manage_checkpoints():
     st.header("Manage Checkpoints")
@@ -37,38 +93,43 @@ def page_manage_checkpoints():
         with st.form("add_cp"):
             name = st.text_input("Name", "")
             station = st.selectbox("Survey station", [s.station_id for s in storage.list_stations()])
-            passage = st.selectbox("Passage type", [p.value for p in PassageType])
+            passage = st.selectbox("Passage type", _PASSAGE_VALUES)
             depth = st.number_input("Depth from entrance (m)", min_value=0.0, value=0.0, step=0.5)
             dist = st.number_input("Distance from station (m)", min_value=0.0, value=0.0, step=0.5)
             submitted = st.form_submit_button("Create")
             if submitted:
                 try:
-                    cp_id = mgr.add_checkpoint(name, PassageType(passage), station, depth, dist)
+                    cp_id = mgr.add_checkpoint(name, _PASSAGE_BY_VALUE[passage], station, depth, dist)
                     st.success(f"Created checkpoint {cp_id}")
                 except Exception as e:
                     st.error(str(e))
 
+    # Read the version before the list: another session may add a checkpoint in between,
+    # and the frame cached under this version must not miss rows the version promises
+    version = mgr.version
     cps = mgr.list_checkpoints()
     if cps:
-        df = pd.DataFrame([{
-            "id": str(c.id), "name": c.name, "passage_type": c.passage_type.value,
-            "station": c.survey_station_id, "depth": c.depth_from_entrance,
-            "distance": c.distance_from_station, "updated_at": c.updated_at
-        } for c in cps])
+        df = checkpoints_frame(version, cps)
         st.dataframe(df, use_container_width=True)
 
         st.subheader("Edit / Delete")
-        selected = st.selectbox("Select checkpoint to edit/delete", df["id"].tolist())
-        if selected:
-            cp = next(c for c in cps if str(c.id) == selected)
+        by_id = {str(c.id): c for c in cps}
+        selected = st.selectbox("Select checkpoint to edit/delete", list(by_id))
+        cp = by_id.get(selected)
+        if selected and cp is None:
+            st.warning("That checkpoint no longer exists.")
+        elif cp is not None:
             new_name = st.text_input("New name", cp.name)
-            new_depth = st.number_input("New depth", value=float(cp.depth_from_entrance), step=0.5)
-            new_distance = st.number_input("New distance", value=float(cp.distance_from_station), step=0.5)
+            new_depth = st.number_input("New depth", min_value=0.0, value=float(cp.depth_from_entrance), step=0.5)
+            new_distance = st.number_input("New distance", min_value=0.0, value=float(cp.distance_from_station), step=0.5)
             cols = st.columns(2)
             with cols[0]:
                 if st.button("Save changes"):
-                    mgr.edit_metadata(UUID(selected), name=new_name, depth_from_entrance=new_depth, distance_from_station=new_distance)
-                    st.success("Saved changes")
+                    try:
+                        mgr.edit_metadata(UUID(selected), name=new_name, depth_from_entrance=new_depth, distance_from_station=new_distance)
+                        st.success("Saved changes")
+                    except Exception as e:
+                        st.error(str(e))
             with cols[1]:
                 if st.button("Delete", type="secondary"):
                     mgr.delete_checkpoint(UUID(selected))
@@ -78,8 +139,8 @@ def page_manage_checkpoints():
 
     st.divider()
     if st.button("Flush offline queue → outbox.json"):
-        n = get_services()[4].flush()
-        st.success(f"Flushed {n} item(s) to outbox.json")
+        start_flush(sync)
+    show_flush_status()
 
 def page_start_session():
     st.header("Start Sampling Session")
@@ -115,10 +176,8 @@ def page_start_session():
         if st.session_state.sess is not None:
             if st.session_state.sess.readings:
                 import pandas as pd
-                df = pd.DataFrame([{
-                    "captured_at": r.captured_at, "O2 %": r.o2_pct, "CO ppm": r.co_ppm,
-                    "H2S ppm": r.h2s_ppm, "LEL %": r.lel_pct
-                } for r in st.session_state.sess.readings])
+                cols = st.session_state.sess.to_arrays()
+                df = pd.DataFrame({label: cols[key] for label, key in _READING_COLUMNS})
                 st.dataframe(df, use_container_width=True)
             else:
                 st.info("No readings yet. Click 'Add mock reading'.")
@@ -148,19 +207,34 @@ def page_stations():
     df = pd.DataFrame([{"id": s.station_id, "name": s.name, "x": s.x, "y": s.y, "z": s.z} for s in sts])
     st.dataframe(df, use_container_width=True)
 
+@st.cache_data(show_spinner=False, max_entries=1)
+def load_outbox_tail(path: str, mtime_ns: int, size: int, limit: int) -> list:
+    # mtime_ns and size only key the cache: an unchanged outbox is never re-read
+    if size == 0:
+        return []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        # Walk back over the last `limit` JSONL records instead of parsing the whole file
+        pos = len(mm) - 1 if mm[-1:] == b"\n" else len(mm)
+        for _ in range(limit):
+            pos = mm.rfind(b"\n", 0, pos)
+            if pos < 0:
+                break
+        tail = mm[pos + 1:]
+    return [_json_loads(line) for line in tail.splitlines() if line.strip()]
+
 def page_offline_queue():
     st.header("Offline Queue & Sync")
     storage, repo, mapc, queue, sync, mgr = get_services()
     st.write("Click 'Flush' to write pending items to `outbox.json`.")
 
     if st.button("Flush now"):
-        n = sync.flush()
-        st.success(f"Flushed {n} item(s).")
+        start_flush(sync)
+    show_flush_status()
     try:
-        import json, os
         if os.path.exists(OUTBOX):
-            data = json.load(open(OUTBOX, "r", encoding="utf-8"))
-            st.subheader("Outbox preview")
+            stat = os.stat(OUTBOX)
+            data = load_outbox_tail(OUTBOX, stat.st_mtime_ns, stat.st_size, OUTBOX_PREVIEW_LINES)
+            st.subheader(f"Outbox preview (last {len(data)})")
             st.json(data)
         else:
             st.info("No outbox.json yet.")
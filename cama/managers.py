@@ -2,10 +2,14 @@ from __future__ import annotations
 from typing import Dict, Optional, List
 from uuid import uuid4, UUID
 from datetime import datetime
+from dataclasses import fields, replace
 
 from .models import Checkpoint, PassageType, QueuedItem, QueueItemType
 from .services import LocalStorageService, ValidationService, OfflineQueue, InteractiveMapController
 
+# A checkpoint's id is its identity (and the cache key), so it cannot be edited
+_EDITABLE_FIELDS = frozenset(f.name for f in fields(Checkpoint) if f.init) - {"id"}
+
 
 class CheckpointManager:
     def __init__(self, map_controller: InteractiveMapController, storage: LocalStorageService, validator: ValidationService, queue: OfflineQueue) -> None:
@@ -14,8 +18,19 @@ class CheckpointManager:
         self.validator = validator
         self.queue = queue
         self.cache: Dict[UUID, Checkpoint] = {}
+        self._loaded = False
+        # Bumped on every add/edit/delete so callers can key derived caches on it
+        self.version = 0
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded: return
+        for cp in self.storage.list_checkpoints():
+            self.cache.setdefault(cp.id, cp)
+        self._loaded = True
 
     def add_checkpoint(self, name: str, passage_type: PassageType, survey_station_id: str, depth_from_entrance: float = 0.0, distance_from_station: float = 0.0) -> UUID:
+        # Warm the cache first so it never holds only the rows added since startup
+        self._ensure_loaded()
         cp = Checkpoint(
             id=uuid4(),
             name=name,
@@ -27,36 +42,37 @@ class CheckpointManager:
         errors = self.validator.validate_checkpoint(cp)
         if errors:
             raise ValueError("; ".join(errors))
-        self.storage.save_checkpoint(cp)
+        self.storage.save_checkpoint(cp, QueuedItem(id=uuid4(), kind=QueueItemType.CHECKPOINT_CREATE, payload=cp.to_dto()))
         self.cache[cp.id] = cp
-        self.queue.add(QueuedItem(id=uuid4(), kind=QueueItemType.CHECKPOINT_CREATE, payload=cp.to_dto()))
+        self.version += 1
         return cp.id
 
     def edit_metadata(self, cp_id: UUID, **updates) -> None:
+        self._ensure_loaded()
         cp = self.cache.get(cp_id)
         if not cp:
             # load from storage
-            for c in self.storage.list_checkpoints():
-                if c.id == cp_id:
-                    cp = c
-                    break
+            cp = self.storage.get_checkpoint(cp_id)
         if not cp:
             raise KeyError("Checkpoint not found")
-        for k, v in updates.items():
-            if hasattr(cp, k):
-                setattr(cp, k, v)
-        cp.updated_at = datetime.utcnow()
+        bad = sorted(set(updates) - _EDITABLE_FIELDS)
+        if bad:
+            raise ValueError(f"cannot edit field(s): {', '.join(bad)}")
+        # Edit a copy so a failed validation leaves the cached checkpoint untouched;
+        # updated_at always reflects this edit, even if the caller passed one
+        cp = replace(cp, **{**updates, "updated_at": datetime.utcnow()})
         errors = self.validator.validate_checkpoint(cp)
         if errors:
             raise ValueError("; ".join(errors))
-        self.storage.save_checkpoint(cp)
+        self.storage.save_checkpoint(cp, QueuedItem(id=uuid4(), kind=QueueItemType.CHECKPOINT_UPDATE, payload=cp.to_dto()))
         self.cache[cp.id] = cp
-        self.queue.add(QueuedItem(id=uuid4(), kind=QueueItemType.CHECKPOINT_UPDATE, payload=cp.to_dto()))
+        self.version += 1
 
     def delete_checkpoint(self, cp_id: UUID) -> None:
-        self.storage.delete_checkpoint(str(cp_id))
+        self.storage.delete_checkpoint(cp_id, QueuedItem(id=uuid4(), kind=QueueItemType.CHECKPOINT_DELETE, payload={"id": str(cp_id)}))
         self.cache.pop(cp_id, None)
-        self.queue.add(QueuedItem(id=uuid4(), kind=QueueItemType.CHECKPOINT_DELETE, payload={"id": str(cp_id)}))
+        self.version += 1
 
-    def list_checkpoints(self):
-        return self.storage.list_checkpoints()
\ No newline at end of file
+    def list_checkpoints(self) -> List[Checkpoint]:
+        self._ensure_loaded()
+        return list(self.cache.values())
\ No newline at end of file
@@ -1,9 +1,12 @@
 from __future__ import annotations
+from array import array
 from dataclasses import dataclass, field, asdict
 from enum import Enum
-from typing import Optional, List, Dict, Tuple
+from collections.abc import Sequence
+from typing import Optional, List, Dict, Tuple, Iterable, Iterator
 from uuid import uuid4, UUID
 from datetime import datetime
+from functools import lru_cache
 
 
 class PassageType(str, Enum):
@@ -15,7 +18,23 @@ class PassageType(str, Enum):
     ROOM = "ROOM"
 
 
-@dataclass(frozen=True)
+_PASSAGE_BY_VALUE = {p.value: p for p in PassageType}
+
+
+@lru_cache(maxsize=4096)
+def _naive_isoformat(dt: datetime) -> str:
+    return dt.isoformat()
+
+
+def _isoformat(dt: datetime) -> str:
+    """ISO string for dt, memoized by value so repeated DTO builds skip the formatting.
+
+    Only naive datetimes are cached: equal aware datetimes can carry different offsets.
+    """
+    return _naive_isoformat(dt) if dt.tzinfo is None else dt.isoformat()
+
+
+@dataclass(frozen=True, slots=True)
 class StationDTO:
     station_id: str
     name: str
@@ -24,7 +43,7 @@ class StationDTO:
     z: float
 
 
-@dataclass
+@dataclass(slots=True)
 class SurveyStation:
     station_id: str
     name: str
@@ -36,7 +55,7 @@ class SurveyStation:
         return StationDTO(self.station_id, self.name, self.x, self.y, self.z)
 
 
-@dataclass
+@dataclass(slots=True)
 class Checkpoint:
     id: UUID
     name: str
@@ -47,6 +66,21 @@ class Checkpoint:
     created_at: datetime = field(default_factory=datetime.utcnow)
     updated_at: datetime = field(default_factory=datetime.utcnow)
 
+    @classmethod
+    def _from_row(cls, id_bytes: bytes, name: str, passage_type: str, survey_station_id: str,
+                  depth: float, distance: float, created_at: str, updated_at: str) -> "Checkpoint":
+        """Rebuild from a stored row without running __init__ and its datetime default factories."""
+        obj = cls.__new__(cls)
+        obj.id = UUID(bytes=id_bytes)
+        obj.name = name
+        obj.passage_type = _PASSAGE_BY_VALUE[passage_type]
+        obj.survey_station_id = survey_station_id
+        obj.depth_from_entrance = depth
+        obj.distance_from_station = distance
+        obj.created_at = datetime.fromisoformat(created_at)
+        obj.updated_at = datetime.fromisoformat(updated_at)
+        return obj
+
     def is_valid(self) -> bool:
         return bool(self.name) and bool(self.survey_station_id) and self.depth_from_entrance >= 0
 
@@ -58,12 +92,23 @@ class Checkpoint:
             "survey_station_id": self.survey_station_id,
             "depth_from_entrance": round(self.depth_from_entrance, 3),
             "distance_from_station": round(self.distance_from_station, 3),
-            "created_at": self.created_at.isoformat(),
+            "created_at": _isoformat(self.created_at),
             "updated_at": self.updated_at.isoformat(),
         }
 
 
-@dataclass
+def _reading_dto(captured_at: datetime, o2_pct: float, co_ppm: float, h2s_ppm: float, lel_pct: float, checkpoint_id: Optional[str]) -> dict:
+    return {
+        "captured_at": captured_at.isoformat(),
+        "o2_pct": round(o2_pct, 3),
+        "co_ppm": round(co_ppm, 3),
+        "h2s_ppm": round(h2s_ppm, 3),
+        "lel_pct": round(lel_pct, 3),
+        "checkpoint_id": checkpoint_id,
+    }
+
+
+@dataclass(frozen=True, slots=True)
 class GasReading:
     o2_pct: float
     co_ppm: float
@@ -73,27 +118,87 @@ class GasReading:
     checkpoint_id: Optional[str] = None  # stringified UUID
 
     def to_dto(self) -> dict:
+        return _reading_dto(self.captured_at, self.o2_pct, self.co_ppm, self.h2s_ppm, self.lel_pct, self.checkpoint_id)
+
+
+class ReadingLog(Sequence):
+    """Append-only readings of a session, also stored column-wise as they arrive.
+
+    Readings are frozen and cannot be replaced, so the columns never go stale.
+    """
+    __slots__ = ("_items", "_captured_at", "_o2", "_co", "_h2s", "_lel", "_checkpoint_id")
+
+    def __init__(self, readings: Iterable[GasReading] = ()) -> None:
+        self._items: List[GasReading] = []
+        self._captured_at: List[datetime] = []
+        self._o2, self._co, self._h2s, self._lel = array("d"), array("d"), array("d"), array("d")
+        self._checkpoint_id: List[Optional[str]] = []
+        for r in readings:
+            self.append(r)
+
+    def append(self, r: GasReading) -> None:
+        self._items.append(r)
+        self._captured_at.append(r.captured_at)
+        self._o2.append(r.o2_pct)
+        self._co.append(r.co_ppm)
+        self._h2s.append(r.h2s_ppm)
+        self._lel.append(r.lel_pct)
+        self._checkpoint_id.append(r.checkpoint_id)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __getitem__(self, i):
+        return self._items[i]
+
+    def __iter__(self) -> Iterator[GasReading]:
+        return iter(self._items)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ReadingLog):
+            return self._items == other._items
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"ReadingLog({self._items!r})"
+
+    def columns(self) -> Dict[str, list]:
+        """Copies of the column buffers; callers may modify them freely."""
         return {
-            "captured_at": self.captured_at.isoformat(),
-            "o2_pct": round(self.o2_pct, 3),
-            "co_ppm": round(self.co_ppm, 3),
-            "h2s_ppm": round(self.h2s_ppm, 3),
-            "lel_pct": round(self.lel_pct, 3),
-            "checkpoint_id": self.checkpoint_id,
+            "captured_at": list(self._captured_at),
+            "o2_pct": array("d", self._o2),
+            "co_ppm": array("d", self._co),
+            "h2s_ppm": array("d", self._h2s),
+            "lel_pct": array("d", self._lel),
+            "checkpoint_id": list(self._checkpoint_id),
         }
 
+    def to_dtos(self) -> List[dict]:
+        return [
+            _reading_dto(*row)
+            for row in zip(self._captured_at, self._o2, self._co, self._h2s, self._lel, self._checkpoint_id)
+        ]
 
-@dataclass
+
+@dataclass(slots=True)
 class SamplingSession:
     id: UUID = field(default_factory=uuid4)
     anchor_station_id: Optional[str] = None
     started_at: datetime = field(default_factory=datetime.utcnow)
     ended_at: Optional[datetime] = None
-    readings: List[GasReading] = field(default_factory=list)
+    readings: ReadingLog = field(default_factory=ReadingLog)
+
+    def __post_init__(self) -> None:
+        if not isinstance(self.readings, ReadingLog):
+            self.readings = ReadingLog(self.readings)
 
     def add_reading(self, r: GasReading) -> None:
         self.readings.append(r)
 
+    def to_arrays(self) -> Dict[str, list]:
+        """Readings as columns: array('d') per gas value plus timestamp and checkpoint id lists (copies)."""
+        return self.readings.columns()
+
     def end(self) -> None:
         self.ended_at = datetime.utcnow()
 
@@ -104,7 +209,7 @@ class SamplingSession:
             "anchor_station_id": self.anchor_station_id,
             "started_at": self.started_at.isoformat(),
             "ended_at": self.ended_at.isoformat() if self.ended_at else None,
-            "readings": [r.to_dto() for r in self.readings],
+            "readings": self.readings.to_dtos(),
             "reading_count": len(self.readings),
         }
 
@@ -116,7 +221,7 @@ class QueueItemType(str, Enum):
     SESSION_UPLOAD = "SESSION_UPLOAD"
 
 
-@dataclass
+@dataclass(slots=True)
 class QueuedItem:
     id: UUID
     kind: QueueItemType
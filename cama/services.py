@@ -1,11 +1,98 @@
 from __future__ import annotations
 from dataclasses import asdict
-from typing import Dict, List, Optional, Tuple, Iterable
+from typing import Callable, Dict, List, Optional, Tuple, Iterable
 from uuid import uuid4, UUID
-from datetime import datetime
-import sqlite3, json, os
-
-from .models import Checkpoint, PassageType, QueuedItem, QueueItemType, SamplingSession, GasReading, SurveyStation
+from contextlib import contextmanager
+from itertools import chain, islice
+import sqlite3, json, os, random, tempfile, threading
+
+try:
+    import orjson
+except ImportError:  # optional speedup; fall back to stdlib json
+    orjson = None
+
+try:
+    import numpy as np
+except ImportError:  # optional speedup; fall back to pure Python
+    np = None
+
+from .models import Checkpoint, QueuedItem, QueueItemType, SamplingSession, GasReading, SurveyStation
+
+_rng = np.random.default_rng() if np is not None else None
+
+# Hot statements live at module level so sqlite3's statement cache reuses the prepared handles
+SQL_SAVE_CP = (
+    "INSERT OR REPLACE INTO checkpoints(id,name,passage_type,survey_station_id,depth,distance,created_at,updated_at) "
+    "VALUES(?,?,?,?,?,?,?,?)"
+)
+SQL_CP_COLUMNS = "SELECT id,name,passage_type,survey_station_id,depth,distance,created_at,updated_at FROM checkpoints"
+SQL_ENQUEUE = "INSERT INTO offline_queue(id,kind,payload,created_at) VALUES(?,?,?,?)"
+SQL_TAKE_BATCH = "SELECT id, kind, payload FROM offline_queue ORDER BY created_at, id LIMIT ?"
+SQL_UPSERT_STATION = "INSERT OR REPLACE INTO stations(station_id,name,x,y,z) VALUES(?,?,?,?,?)"
+SQL_STATION_COLUMNS = "SELECT station_id,name,x,y,z FROM stations"
+SQL_SEED_STATION = "INSERT OR IGNORE INTO stations(station_id,name,x,y,z) VALUES(?,?,?,?,?)"
+SQL_SAVE_SESSION = "INSERT OR REPLACE INTO sessions(id,anchor_id,started_at,ended_at) VALUES(?,?,?,?)"
+SQL_INSERT_READING = "INSERT INTO readings(session_id,captured_at,o2,co,h2s,lel,checkpoint_id) VALUES(?,?,?,?,?,?,?)"
+# 128 rows x 7 params stays under SQLite's default 999 bound-variable limit
+READINGS_PER_STMT = 128
+SQL_INSERT_READINGS_MULTI = (
+    "INSERT INTO readings(session_id,captured_at,o2,co,h2s,lel,checkpoint_id) VALUES"
+    + ",".join(["(?,?,?,?,?,?,?)"] * READINGS_PER_STMT)
+)
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS checkpoints(
+        id BLOB PRIMARY KEY,
+        name TEXT NOT NULL,
+        passage_type TEXT NOT NULL,
+        survey_station_id TEXT NOT NULL,
+        depth REAL NOT NULL,
+        distance REAL NOT NULL,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS offline_queue(
+        id BLOB PRIMARY KEY,
+        kind TEXT NOT NULL,
+        payload BLOB NOT NULL,
+        created_at TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_queue_created ON offline_queue(created_at, id);
+    CREATE TABLE IF NOT EXISTS sessions(
+        id BLOB PRIMARY KEY,
+        anchor_id TEXT,
+        started_at TEXT NOT NULL,
+        ended_at TEXT
+    );
+    CREATE TABLE IF NOT EXISTS readings(
+        session_id BLOB NOT NULL,
+        captured_at TEXT NOT NULL,
+        o2 REAL NOT NULL,
+        co REAL NOT NULL,
+        h2s REAL NOT NULL,
+        lel REAL NOT NULL,
+        checkpoint_id TEXT
+    );
+    CREATE TABLE IF NOT EXISTS stations(
+        station_id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        x REAL NOT NULL,
+        y REAL NOT NULL,
+        z REAL NOT NULL
+    );
+    """
+
+
+def _json_dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def _json_loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
 
 
 class ValidationService:
@@ -23,144 +110,211 @@ class ValidationService:
 class LocalStorageService:
     def __init__(self, db_path: str = ":memory:") -> None:
         # Alow cross-thread use for Streamlit reruns
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, cached_statements=256)
+        # WAL lets readers run alongside the writer; writers still serialize on the lock
+        self.conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA mmap_size=268435456;
+            PRAGMA cache_size=-65536;
+            """
+        )
         self.conn.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        # Bumped on every station write so readers can invalidate derived caches
+        self.stations_version = 0
         self._init()
 
     def _init(self) -> None:
-        cur = self.conn.cursor()
-        cur.executescript(
-            """
-            CREATE TABLE IF NOT EXISTS checkpoints(
-                id TEXT PRIMARY KEY,
-                name TEXT NOT NULL,
-                passage_type TEXT NOT NULL,
-                survey_station_id TEXT NOT NULL,
-                depth REAL NOT NULL,
-                distance REAL NOT NULL,
-                created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL
-            );
-            CREATE TABLE IF NOT EXISTS offline_queue(
-                id TEXT PRIMARY KEY,
-                kind TEXT NOT NULL,
-                payload TEXT NOT NULL,
-                created_at TEXT NOT NULL
-            );
-            CREATE TABLE IF NOT EXISTS sessions(
-                id TEXT PRIMARY KEY,
-                anchor_id TEXT,
-                started_at TEXT NOT NULL,
-                ended_at TEXT
-            );
-            CREATE TABLE IF NOT EXISTS readings(
-                session_id TEXT NOT NULL,
-                captured_at TEXT NOT NULL,
-                o2 REAL NOT NULL,
-                co REAL NOT NULL,
-                h2s REAL NOT NULL,
-                lel REAL NOT NULL,
-                checkpoint_id TEXT
-            );
-            CREATE TABLE IF NOT EXISTS stations(
-                station_id TEXT PRIMARY KEY,
-                name TEXT NOT NULL,
-                x REAL NOT NULL,
-                y REAL NOT NULL,
-                z REAL NOT NULL
-            );
-            """
-        )
+        self.conn.executescript(SCHEMA)
         self.conn.commit()
+        self._migrate_text_uuids()
+
+    def _migrate_text_uuids(self) -> None:
+        # Databases created before UUID keys were stored as 16-byte BLOBs hold 36-char TEXT ids
+        cols = {r["name"]: r["type"] for r in self.conn.execute("PRAGMA table_info(checkpoints)")}
+        if cols.get("id") != "TEXT":
+            return
+        self.conn.create_function(
+            "uuid_bytes", 1, lambda v: UUID(v).bytes if isinstance(v, str) else v, deterministic=True
+        )
+        legacy = ("checkpoints", "offline_queue", "sessions", "readings")
+        try:
+            self.conn.executescript(
+                "BEGIN;"
+                "DROP INDEX IF EXISTS idx_queue_created;"
+                + "".join(f"ALTER TABLE {t} RENAME TO _legacy_{t};" for t in legacy)
+                + SCHEMA
+                + """
+                INSERT INTO checkpoints SELECT uuid_bytes(id), name, passage_type, survey_station_id, depth, distance, created_at, updated_at FROM _legacy_checkpoints;
+                INSERT INTO offline_queue SELECT uuid_bytes(id), kind, payload, created_at FROM _legacy_offline_queue;
+                INSERT INTO sessions SELECT uuid_bytes(id), anchor_id, started_at, ended_at FROM _legacy_sessions;
+                INSERT INTO readings SELECT uuid_bytes(session_id), captured_at, o2, co, h2s, lel, checkpoint_id FROM _legacy_readings;
+                """
+                + "".join(f"DROP TABLE _legacy_{t};" for t in legacy)
+                + "COMMIT;"
+            )
+        except Exception:
+            self.conn.rollback()
+            raise
+
+    def _fetch_tuples(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        """Fetch plain tuples, skipping sqlite3.Row construction on hot read paths."""
+        cur = self.conn.cursor()
+        cur.row_factory = None
+        return cur.execute(sql, params).fetchall()
+
+    @contextmanager
+    def _write(self):
+        """Serialize writers and commit (or roll back) as one transaction."""
+        with self._lock, self.conn:
+            yield self.conn
 
     # Checkpoints
-    def save_checkpoint(self, cp: Checkpoint) -> None:
-        self.conn.execute(
-            """INSERT OR REPLACE INTO checkpoints(id,name,passage_type,survey_station_id,depth,distance,created_at,updated_at)
-                   VALUES(?,?,?,?,?,?,?,?)""",
-            (
-                str(cp.id), cp.name, cp.passage_type.value, cp.survey_station_id,
-                cp.depth_from_entrance, cp.distance_from_station,
-                cp.created_at.isoformat(), cp.updated_at.isoformat()
-            ),
-        )
-        self.conn.commit()
+    def save_checkpoint(self, cp: Checkpoint, event: Optional[QueuedItem] = None) -> None:
+        """Persist cp and, if given, enqueue its sync event in the same transaction."""
+        self.save_checkpoints([cp], [event] if event else ())
 
-    def delete_checkpoint(self, cp_id: str) -> None:
-        self.conn.execute("DELETE FROM checkpoints WHERE id=?", (cp_id,))
-        self.conn.commit()
+    def save_checkpoints(self, cps: Iterable[Checkpoint], events: Iterable[QueuedItem] = ()) -> None:
+        with self._write():
+            self._insert_queued(events)
+            self.conn.executemany(
+                SQL_SAVE_CP,
+                [
+                    (
+                        cp.id.bytes, cp.name, cp.passage_type.value, cp.survey_station_id,
+                        cp.depth_from_entrance, cp.distance_from_station,
+                        cp.created_at.isoformat(), cp.updated_at.isoformat()
+                    )
+                    for cp in cps
+                ],
+            )
+
+    def delete_checkpoint(self, cp_id: UUID, event: Optional[QueuedItem] = None) -> None:
+        with self._write():
+            self._insert_queued([event] if event else ())
+            self.conn.execute("DELETE FROM checkpoints WHERE id=?", (cp_id.bytes,))
 
     def list_checkpoints(self) -> List[Checkpoint]:
-        rows = self.conn.execute("SELECT * FROM checkpoints").fetchall()
-        out: List[Checkpoint] = []
-        for r in rows:
-            out.append(Checkpoint(
-                id=UUID(r["id"]),
-                name=r["name"],
-                passage_type=PassageType(r["passage_type"]),
-                survey_station_id=r["survey_station_id"],
-                depth_from_entrance=r["depth"],
-                distance_from_station=r["distance"],
-                created_at=datetime.fromisoformat(r["created_at"]),
-                updated_at=datetime.fromisoformat(r["updated_at"]),
-            ))
-        return out
+        return [Checkpoint._from_row(*r) for r in self._fetch_tuples(SQL_CP_COLUMNS)]
+
+    def get_checkpoint(self, cp_id: UUID) -> Optional[Checkpoint]:
+        rows = self._fetch_tuples(SQL_CP_COLUMNS + " WHERE id=? LIMIT 1", (cp_id.bytes,))
+        if not rows: return None
+        return Checkpoint._from_row(*rows[0])
 
     #queue
     def enqueue(self, item: QueuedItem) -> None:
-        self.conn.execute(
-            "INSERT INTO offline_queue(id,kind,payload,created_at) VALUES(?,?,?,?)",
-            (str(item.id), item.kind.value, json.dumps(item.payload), item.created_at.isoformat())
+        self.enqueue_many([item])
+
+    def enqueue_many(self, items: Iterable[QueuedItem]) -> None:
+        with self._write():
+            self._insert_queued(items)
+
+    def _insert_queued(self, items: Iterable[QueuedItem]) -> None:
+        self.conn.executemany(
+            SQL_ENQUEUE,
+            [(i.id.bytes, i.kind.value, _json_dumps(i.payload), i.created_at.isoformat()) for i in items]
         )
-        self.conn.commit()
 
     def take_batch(self, n: int) -> List[QueuedItem]:
-        rows = self.conn.execute("SELECT * FROM offline_queue ORDER BY created_at LIMIT ?", (n,)).fetchall()
         items: List[QueuedItem] = []
-        for r in rows:
+        for id_, kind, payload in self._fetch_tuples(SQL_TAKE_BATCH, (n,)):
             items.append(QueuedItem(
-                id=UUID(r["id"]),
-                kind=QueueItemType(r["kind"]),
-                payload=json.loads(r["payload"]),
+                id=UUID(bytes=id_),
+                kind=QueueItemType(kind),
+                payload=_json_loads(payload),
             ))
         return items
 
-    def purge(self, ids: Iterable[str]) -> None:
-        self.conn.executemany("DELETE FROM offline_queue WHERE id=?", [(i,) for i in ids])
-        self.conn.commit()
+    def purge(self, ids: Iterable[UUID]) -> None:
+        with self._write():
+            self._delete_queued([i.bytes for i in ids])
+
+    def _delete_queued(self, ids: List[bytes]) -> None:
+        if not ids: return
+        self.conn.execute(f"DELETE FROM offline_queue WHERE id IN ({','.join('?' * len(ids))})", ids)
+
+    def flush_batch(self, n: int, writer: Callable[[List[Tuple[str, str, bytes]]], None]) -> int:
+        """Take up to n queued rows, hand them to writer, then delete them, all in one transaction.
+
+        writer receives (id, kind, payload) tuples with the payload still JSON-encoded, so it
+        can forward the bytes without decoding them. If writer raises, the transaction rolls
+        back and the items stay queued.
+        """
+        with self._lock, self.conn:
+            if not self.conn.in_transaction:
+                self.conn.execute("BEGIN IMMEDIATE")
+            fetched = self._fetch_tuples(SQL_TAKE_BATCH, (n,))
+            if fetched:
+                writer([
+                    (str(UUID(bytes=id_)), kind, payload if isinstance(payload, bytes) else payload.encode("utf-8"))
+                    for id_, kind, payload in fetched
+                ])
+                self._delete_queued([r[0] for r in fetched])
+            return len(fetched)
 
     # Sessions & Readings
     def save_session(self, sess: SamplingSession) -> None:
-        self.conn.execute(
-            "INSERT OR REPLACE INTO sessions(id,anchor_id,started_at,ended_at) VALUES(?,?,?,?)",
-            (str(sess.id), sess.anchor_station_id, sess.started_at.isoformat(), sess.ended_at.isoformat() if sess.ended_at else None)
-        )
-        if sess.readings:
-            self.conn.executemany(
-                "INSERT INTO readings(session_id,captured_at,o2,co,h2s,lel,checkpoint_id) VALUES(?,?,?,?,?,?,?)",
-                [
-                    (str(sess.id), r.captured_at.isoformat(), r.o2_pct, r.co_ppm, r.h2s_ppm, r.lel_pct, r.checkpoint_id)
-                    for r in sess.readings
-                ]
+        with self._write():
+            self.conn.execute(
+                SQL_SAVE_SESSION,
+                (sess.id.bytes, sess.anchor_station_id, sess.started_at.isoformat(), sess.ended_at.isoformat() if sess.ended_at else None)
             )
-        self.conn.commit()
+            if sess.readings:
+                self._insert_readings(self._reading_rows(sess))
+
+    @staticmethod
+    def _reading_rows(sess: SamplingSession) -> Iterable[Tuple]:
+        # Lazily yield rows; consecutive readings sharing a timestamp reuse its ISO string
+        sid = sess.id.bytes
+        last_ts = last_iso = None
+        for r in sess.readings:
+            if r.captured_at != last_ts:
+                last_ts, last_iso = r.captured_at, r.captured_at.isoformat()
+            yield (sid, last_iso, r.o2_pct, r.co_ppm, r.h2s_ppm, r.lel_pct, r.checkpoint_id)
+
+    def _insert_readings(self, rows: Iterable[Tuple]) -> None:
+        """Insert full chunks with one multi-row VALUES statement; the tail goes through executemany."""
+        it = iter(rows)
+        while True:
+            chunk = list(islice(it, READINGS_PER_STMT))
+            if len(chunk) < READINGS_PER_STMT:
+                if chunk:
+                    self.conn.executemany(SQL_INSERT_READING, chunk)
+                return
+            self.conn.execute(SQL_INSERT_READINGS_MULTI, tuple(chain.from_iterable(chunk)))
 
     # Stations
     def upsert_station(self, st: SurveyStation) -> None:
-        self.conn.execute(
-            "INSERT OR REPLACE INTO stations(station_id,name,x,y,z) VALUES(?,?,?,?,?)",
-            (st.station_id, st.name, st.x, st.y, st.z)
-        )
-        self.conn.commit()
+        self.upsert_stations([st])
+
+    def upsert_stations(self, stations: Iterable[SurveyStation]) -> None:
+        with self._write():
+            self.conn.executemany(
+                SQL_UPSERT_STATION,
+                [(st.station_id, st.name, st.x, st.y, st.z) for st in stations]
+            )
+            self.stations_version += 1
+
+    def seed_stations(self, stations: Iterable[SurveyStation]) -> None:
+        """Insert stations that do not exist yet; existing rows are left as they are."""
+        with self._write():
+            self.conn.executemany(
+                SQL_SEED_STATION,
+                [(st.station_id, st.name, st.x, st.y, st.z) for st in stations]
+            )
+            self.stations_version += 1
 
     def get_station(self, station_id: str) -> Optional[SurveyStation]:
-        r = self.conn.execute("SELECT * FROM stations WHERE station_id=?", (station_id,)).fetchone()
-        if not r: return None
-        return SurveyStation(r["station_id"], r["name"], r["x"], r["y"], r["z"])
+        rows = self._fetch_tuples(SQL_STATION_COLUMNS + " WHERE station_id=?", (station_id,))
+        if not rows: return None
+        return SurveyStation(*rows[0])
 
     def list_stations(self) -> List[SurveyStation]:
-        rows = self.conn.execute("SELECT * FROM stations").fetchall()
-        return [SurveyStation(r["station_id"], r["name"], r["x"], r["y"], r["z"]) for r in rows]
+        return [SurveyStation(*r) for r in self._fetch_tuples(SQL_STATION_COLUMNS)]
 
 
 class OfflineQueue:
@@ -175,38 +329,73 @@ class OfflineQueue:
         return self.storage.take_batch(n)
 
     def purge(self, items: List[QueuedItem]) -> None:
-        self.storage.purge([str(i.id) for i in items])
+        self.storage.purge([i.id for i in items])
 
 
 class SyncService:
+    """Appends flushed items to the outbox as newline-delimited JSON (one record per line)."""
     def __init__(self, storage: LocalStorageService, queue: OfflineQueue, outbox_path: str) -> None:
         self.storage = storage
         self.queue = queue
         self.outbox_path = outbox_path
+        self._migrate_outbox()
+
+    def _migrate_outbox(self) -> None:
+        # Older outboxes were a single JSON array; rewrite them once as JSONL
+        if not os.path.exists(self.outbox_path):
+            return
+        with open(self.outbox_path, "rb") as f:
+            data = f.read().strip()
+        if not data.startswith(b"["):
+            return
+        records = _json_loads(data)
+        # Write beside the original and swap it in, so a crash mid-write never truncates the outbox
+        fd, tmp_path = tempfile.mkstemp(prefix=".outbox-", dir=os.path.dirname(os.path.abspath(self.outbox_path)))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(b"".join(_json_dumps(rec) + b"\n" for rec in records))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.outbox_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
 
     def flush(self, n: int = 50) -> int:
-        batch = self.queue.take_batch(n)
-        if not batch: return 0
-        existing = []
-        if os.path.exists(self.outbox_path):
-            with open(self.outbox_path, "r", encoding="utf-8") as f:
-                data = f.read().strip()
-                existing = json.loads(data) if data else []
-        existing += [{"id": str(i.id), "kind": i.kind.value, "payload": i.payload} for i in batch]
-        with open(self.outbox_path, "w", encoding="utf-8") as f:
-            json.dump(existing, f, indent=2)
-        self.queue.purge(batch)
-        return len(batch)
+        return self.storage.flush_batch(n, self._append_outbox)
+
+    def _append_outbox(self, rows: List[Tuple[str, str, bytes]]) -> None:
+        # Splice the stored payload bytes straight into each record instead of decoding and re-encoding
+        with open(self.outbox_path, "ab") as f:
+            f.write(b"".join(
+                b'{"id":' + _json_dumps(id_) + b',"kind":' + _json_dumps(kind) + b',"payload":' + payload + b"}\n"
+                for id_, kind, payload in rows
+            ))
 
 
 class SurveyDataRepository:
     """Aggregation in diagram: does not own station lifecycle."""
     def __init__(self, storage: LocalStorageService) -> None:
         self.storage = storage
+        self._version = -1
+        self._stations: List[SurveyStation] = []
+        self._coords = None  # (N, 3) float64 array when numpy is available
+
+    def _refresh(self) -> None:
+        version = self.storage.stations_version
+        if version == self._version: return
+        self._stations = self.storage.list_stations()
+        if np is not None:
+            self._coords = np.array([(st.x, st.y, st.z) for st in self._stations], dtype=np.float64).reshape(-1, 3)
+        self._version = version
 
     def nearest_station(self, x: float, y: float, z: float) -> Optional[SurveyStation]:
-        stations = self.storage.list_stations()
+        self._refresh()
+        stations = self._stations
         if not stations: return None
+        if self._coords is not None:
+            diff = self._coords - np.array([x, y, z], dtype=np.float64)
+            return stations[int(np.argmin(np.einsum("ij,ij->i", diff, diff)))]
         def d(st): return (st.x-x)**2 + (st.y-y)**2 + (st.z-z)**2
         return min(stations, key=d)
 
@@ -221,15 +410,23 @@ class InteractiveMapController:
 
 
 class MeterConnectionManager:
+    # (low, high, decimals) per field of a simulated but plausible reading (O2 ~ 20.9% normal)
+    RANGES = {
+        "o2_pct": (18.0, 21.0, 2),
+        "co_ppm": (0.0, 15.0, 1),
+        "h2s_ppm": (0.0, 5.0, 1),
+        "lel_pct": (0.0, 5.0, 1),
+    }
+
     def produce_reading(self) -> GasReading:
-        import random
-        # Create a simulated but plausible reading (O2 ~ 20.9% normal)
-        return GasReading(
-            o2_pct=round(random.uniform(18.0, 21.0), 2),
-            co_ppm=round(random.uniform(0, 15), 1),
-            h2s_ppm=round(random.uniform(0, 5), 1),
-            lel_pct=round(random.uniform(0, 5), 1),
-        )
+        return self.produce_readings(1)[0]
+
+    def produce_readings(self, n: int) -> List[GasReading]:
+        if _rng is not None:
+            cols = [np.round(_rng.uniform(lo, hi, n), d).tolist() for lo, hi, d in self.RANGES.values()]
+        else:
+            cols = [[round(random.uniform(lo, hi), d) for _ in range(n)] for lo, hi, d in self.RANGES.values()]
+        return [GasReading(*vals) for vals in zip(*cols)]
 
 
 class CrashRecoveryService:
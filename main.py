@@ -9,8 +9,10 @@ OUTBOX = os.path.join(os.path.dirname(__file__), "outbox.json")
 
 def seed_stations(storage):
     from cama.models import SurveyStation
-    for name, x, y, z in [("A1",0.0,0.0,0.0), ("B5",10.0,2.0,0.0), ("C12",25.0,-3.0,-1.0), ("Z78",100.0,0.0,-5.0)]:
-        storage.upsert_station(SurveyStation(station_id=name, name=name, x=x, y=y, z=z))
+    storage.upsert_stations([
+        SurveyStation(station_id=name, name=name, x=x, y=y, z=z)
+        for name, x, y, z in [("A1",0.0,0.0,0.0), ("B5",10.0,2.0,0.0), ("C12",25.0,-3.0,-1.0), ("Z78",100.0,0.0,-5.0)]
+    ])
 
 def demo():
     storage = LocalStorageService(DB)
@@ -33,8 +35,8 @@ def demo():
     print("\n== Demo: Start Sampling Session ==")
     meter = MeterConnectionManager()
     sess = SamplingSession(anchor_station_id="A1")
-    for _ in range(3):
-        sess.add_reading(meter.produce_reading())
+    for r in meter.produce_readings(3):
+        sess.add_reading(r)
     sess.end()
     storage.save_session(sess)
     queue.add(QueuedItem(id=uuid4(), kind=QueueItemType.SESSION_UPLOAD, payload=sess.to_dto()))
@@ -1,4 +1,6 @@
 import os, json, shutil, tempfile, unittest
+from dataclasses import asdict
+from datetime import datetime
 from uuid import uuid4
 from cama.models import PassageType, SamplingSession, GasReading, QueuedItem, QueueItemType, SurveyStation
 from cama.services import LocalStorageService, OfflineQueue, SyncService, SurveyDataRepository, InteractiveMapController, ValidationService
@@ -32,7 +34,7 @@ class PayloadTests(unittest.TestCase):
         flushed = self.sync.flush()
         self.assertGreaterEqual(flushed, 1)
         with open(self.out, "r", encoding="utf-8") as f:
-            data = json.load(f)
+            data = [json.loads(line) for line in f if line.strip()]
         last = data[-1]
         self.assertEqual(last["kind"], "SESSION_UPLOAD")
         readings = last["payload"]["readings"]
@@ -42,16 +44,90 @@ class PayloadTests(unittest.TestCase):
         self.assertIn("co_ppm", readings[0])
         self.assertIn("captured_at", readings[0])
 
+    def test_session_columns_match_readings(self):
+        sess = SamplingSession(anchor_station_id="A1", readings=[GasReading(20.5, 0.5, 0.0, 0.1)])
+        sess.add_reading(GasReading(20.1, 1.0, 0.1, 0.0, checkpoint_id="cp"))
+        sess.readings.append(GasReading(19.9, 2.0, 0.2, 0.3))
+        # Readings cannot be replaced or mutated in place, so the columns cannot go stale
+        with self.assertRaises(TypeError):
+            sess.readings[0] = GasReading(9.0, 0.5, 0.0, 0.1)
+        with self.assertRaises(AttributeError):
+            sess.readings[0].o2_pct = 9.0
+        cols = sess.to_arrays()
+        self.assertEqual(list(cols["o2_pct"]), [20.5, 20.1, 19.9])
+        self.assertEqual(cols["checkpoint_id"], [None, "cp", None])
+        cols["o2_pct"][0] = 1.0
+        self.assertEqual(sess.to_arrays()["o2_pct"][0], 20.5)
+        self.assertEqual(sess.to_dto()["readings"], [r.to_dto() for r in sess.readings])
+
     def test_checkpoint_payload_roundtrip(self):
         mgr = CheckpointManager(self.mapc, self.storage, ValidationService(), self.queue)
         cp_id = mgr.add_checkpoint("CP", PassageType.CRAWL, "A1", 1.23456, 0.98765)
         flushed = self.sync.flush()
         self.assertGreaterEqual(flushed, 1)
         with open(self.out, "r", encoding="utf-8") as f:
-            data = json.load(f)
+            data = [json.loads(line) for line in f if line.strip()]
         payload = data[-1]["payload"]
         self.assertEqual(payload["name"], "CP")
         self.assertAlmostEqual(payload["depth_from_entrance"], 1.235, places=3)
 
+    def test_flush_appends_jsonl_and_migrates_array_outbox(self):
+        with open(self.out, "w", encoding="utf-8") as f:
+            json.dump([{"id": "old", "kind": "CHECKPOINT_DELETE", "payload": {"id": "x"}}], f, indent=2)
+        sync = SyncService(self.storage, self.queue, self.out)
+        for _ in range(2):
+            self.queue.add(QueuedItem(id=uuid4(), kind=QueueItemType.CHECKPOINT_DELETE, payload={"id": "y"}))
+            self.assertEqual(sync.flush(), 1)
+        with open(self.out, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[0])["id"], "old")
+
+    def test_manager_cache_loads_existing_checkpoints(self):
+        first = CheckpointManager(self.mapc, self.storage, ValidationService(), self.queue)
+        old_id = first.add_checkpoint("Old", PassageType.TUBE, "A1")
+        mgr = CheckpointManager(self.mapc, self.storage, ValidationService(), self.queue)
+        new_id = mgr.add_checkpoint("New", PassageType.PIT, "A1")
+        self.assertEqual({c.id for c in mgr.list_checkpoints()}, {old_id, new_id})
+        mgr.delete_checkpoint(old_id)
+        self.assertEqual([c.id for c in mgr.list_checkpoints()], [new_id])
+
+    def test_failed_outbox_write_keeps_items_queued(self):
+        self.queue.add(QueuedItem(id=uuid4(), kind=QueueItemType.CHECKPOINT_DELETE, payload={"id": "y"}))
+        def boom(batch):
+            raise OSError("disk full")
+        with self.assertRaises(OSError):
+            self.storage.flush_batch(10, boom)
+        self.assertEqual(len(self.queue.take_batch(10)), 1)
+        self.assertEqual(self.sync.flush(), 1)
+        self.assertEqual(self.queue.take_batch(10), [])
+
+    def test_failed_edit_leaves_checkpoint_unchanged(self):
+        mgr = CheckpointManager(self.mapc, self.storage, ValidationService(), self.queue)
+        cp_id = mgr.add_checkpoint("CP", PassageType.PIT, "A1", 1.0)
+        with self.assertRaises(ValueError):
+            mgr.edit_metadata(cp_id, name="", depth_from_entrance=-5)
+        cached = [(c.name, c.depth_from_entrance) for c in mgr.list_checkpoints()]
+        stored = [(c.name, c.depth_from_entrance) for c in self.storage.list_checkpoints()]
+        self.assertEqual(cached, [("CP", 1.0)])
+        self.assertEqual(stored, [("CP", 1.0)])
+        mgr.edit_metadata(cp_id, depth_from_entrance=2.0)
+        self.assertEqual(self.storage.get_checkpoint(cp_id).depth_from_entrance, 2.0)
+
+    def test_edit_field_rules(self):
+        mgr = CheckpointManager(self.mapc, self.storage, ValidationService(), self.queue)
+        cp_id = mgr.add_checkpoint("CP", PassageType.PIT, "A1")
+        mgr.edit_metadata(cp_id, updated_at=datetime(2020, 1, 1), created_at=datetime(2000, 1, 1))
+        cp = self.storage.get_checkpoint(cp_id)
+        self.assertEqual(cp.created_at, datetime(2000, 1, 1))
+        self.assertEqual(cp.to_dto()["created_at"], "2000-01-01T00:00:00")
+        self.assertGreater(cp.updated_at, datetime(2020, 1, 1))
+        with self.assertRaises(ValueError):
+            mgr.edit_metadata(cp_id, id=uuid4(), name="Renamed")
+        with self.assertRaises(ValueError):
+            mgr.edit_metadata(cp_id, colour="red")
+        self.assertEqual(self.storage.get_checkpoint(cp_id).name, "CP")
+        self.assertNotIn("_created_iso", asdict(cp))
+
 if __name__ == "__main__":
     unittest.main(verbosity=2)
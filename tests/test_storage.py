@@ -0,0 +1,88 @@
+import os, shutil, sqlite3, tempfile, unittest
+from uuid import uuid4
+from cama.models import Checkpoint, PassageType, QueuedItem, QueueItemType, SurveyStation
+from cama.services import LocalStorageService, SurveyDataRepository
+
+class StorageTests(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix="cama_tests_")
+        self.db = os.path.join(self.tmpdir, "test.db")
+        self.storage = LocalStorageService(self.db)
+
+    def tearDown(self):
+        try:
+            self.storage.conn.close()
+            shutil.rmtree(self.tmpdir)
+        except Exception:
+            pass
+
+    def test_batch_inserts(self):
+        self.storage.upsert_stations([SurveyStation(f"S{i}", f"S{i}", i, 0, 0) for i in range(10)])
+        self.assertEqual(len(self.storage.list_stations()), 10)
+        cps = [Checkpoint(uuid4(), f"CP{i}", PassageType.TUBE, "S1") for i in range(5)]
+        self.storage.save_checkpoints(cps)
+        self.assertEqual({c.id for c in self.storage.list_checkpoints()}, {c.id for c in cps})
+        self.storage.enqueue_many([QueuedItem(uuid4(), QueueItemType.CHECKPOINT_CREATE, c.to_dto()) for c in cps])
+        self.assertEqual(len(self.storage.take_batch(50)), 5)
+
+    def test_seed_stations_keeps_existing_rows(self):
+        self.storage.upsert_station(SurveyStation("A1", "Renamed", 1, 1, 1))
+        self.storage.seed_stations([SurveyStation("A1", "A1", 0, 0, 0), SurveyStation("B5", "B5", 10, 2, 0)])
+        self.storage.seed_stations([SurveyStation("B5", "B5", 10, 2, 0)])
+        self.assertEqual(len(self.storage.list_stations()), 2)
+        self.assertEqual(self.storage.get_station("A1").name, "Renamed")
+
+    def test_checkpoint_and_event_commit_together(self):
+        item = QueuedItem(uuid4(), QueueItemType.CHECKPOINT_CREATE, {"id": "x"})
+        self.storage.enqueue(item)
+        cp = Checkpoint(uuid4(), "CP", PassageType.PIT, "A1")
+        # Reusing the queued item's id makes the event insert fail, so the checkpoint must roll back too
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.storage.save_checkpoint(cp, item)
+        self.assertIsNone(self.storage.get_checkpoint(cp.id))
+        self.assertEqual(len(self.storage.take_batch(10)), 1)
+
+    def test_get_checkpoint(self):
+        cp = Checkpoint(uuid4(), "CP", PassageType.PIT, "A1", 2.0)
+        self.storage.save_checkpoint(cp)
+        got = self.storage.get_checkpoint(cp.id)
+        self.assertEqual(got.name, "CP")
+        self.assertEqual(got.passage_type, PassageType.PIT)
+        self.assertIsNone(self.storage.get_checkpoint(uuid4()))
+
+    def test_nearest_station_sees_new_stations(self):
+        repo = SurveyDataRepository(self.storage)
+        self.assertIsNone(repo.nearest_station(0, 0, 0))
+        self.storage.upsert_stations([SurveyStation("A1", "A1", 0, 0, 0), SurveyStation("B5", "B5", 10, 2, 0)])
+        self.assertEqual(repo.nearest_station(9, 1, 0).station_id, "B5")
+        self.storage.upsert_station(SurveyStation("C2", "C2", 8, 1, 0))
+        self.assertEqual(repo.nearest_station(8.1, 1, 0).station_id, "C2")
+
+    def test_migrates_legacy_text_ids(self):
+        legacy = os.path.join(self.tmpdir, "legacy.db")
+        cp_id, item_id = uuid4(), uuid4()
+        conn = sqlite3.connect(legacy)
+        conn.executescript("""
+            CREATE TABLE checkpoints(id TEXT PRIMARY KEY, name TEXT NOT NULL, passage_type TEXT NOT NULL,
+                survey_station_id TEXT NOT NULL, depth REAL NOT NULL, distance REAL NOT NULL,
+                created_at TEXT NOT NULL, updated_at TEXT NOT NULL);
+            CREATE TABLE offline_queue(id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, created_at TEXT NOT NULL);
+            CREATE TABLE sessions(id TEXT PRIMARY KEY, anchor_id TEXT, started_at TEXT NOT NULL, ended_at TEXT);
+            CREATE TABLE readings(session_id TEXT NOT NULL, captured_at TEXT NOT NULL, o2 REAL NOT NULL, co REAL NOT NULL,
+                h2s REAL NOT NULL, lel REAL NOT NULL, checkpoint_id TEXT);
+        """)
+        conn.execute("INSERT INTO checkpoints VALUES(?,?,?,?,?,?,?,?)",
+                     (str(cp_id), "Old", "TUBE", "A1", 1.0, 0.0, "2025-01-01T00:00:00", "2025-01-01T00:00:00"))
+        conn.execute("INSERT INTO offline_queue VALUES(?,?,?,?)", (str(item_id), "CHECKPOINT_DELETE", '{"id": "x"}', "2025-01-01T00:00:00"))
+        conn.commit()
+        conn.close()
+        storage = LocalStorageService(legacy)
+        try:
+            self.assertEqual([c.id for c in storage.list_checkpoints()], [cp_id])
+            self.assertEqual([i.id for i in storage.take_batch(10)], [item_id])
+            self.assertEqual(storage.conn.execute("SELECT typeof(id) FROM checkpoints").fetchone()[0], "blob")
+        finally:
+            storage.conn.close()
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)